@@ -8,10 +8,14 @@ Outputs:
 """
 
 import requests
+import requests_cache
 import pandas as pd
 import re
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
 from time import sleep
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Valid dataset (Vintage 2023):
 # https://api.census.gov/data/2023/pep/charv.html
@@ -21,6 +25,15 @@ CENSUS_COUNTY_URL_TMPL = "https://api.census.gov/data/2023/pep/charv?get=NAME&fo
 OUT_CSV = "us_counties.csv"
 OUT_JSON = "us_counties.json"
 
+# Vintage 2023 responses never change; re-runs are served from this local cache
+CACHE_DB = "census_cache.sqlite"
+CACHE_EXPIRE = timedelta(days=30)
+
+# per-state fetches are independent; stay well under Census soft limits
+MAX_WORKERS = 8
+
+USER_AGENT = "Utkarsh-GDELT-Research-Crawler/3.1 (county-fetch)"
+
 REMOVALS = [
     r"\bCounty\b",
     r"\bParish\b",
@@ -33,9 +46,34 @@ REMOVALS = [
     r"\bDistrict\b",
 ]
 
+# one pass over the label; longest patterns first so "City and Borough" wins over "City"/"Borough".
+# Versus the old sequential re.sub loop this changes four Alaska names (Juneau, Sitka, Wrangell,
+# Yakutat: "Sitka and" -> "Sitka"). county_name_clean is the county key in gdelt_query_log.csv and
+# the FEMA spine, so rows written under the old names no longer match once the table is regenerated.
+_REMOVAL_RE = re.compile("|".join(sorted(REMOVALS, key=len, reverse=True)), re.IGNORECASE)
+_WS_RE = re.compile(r"\s{2,}")
+
+# ---------------- HTTP session (keep-alive + pooled connections + on-disk cache) ----------------
+def make_session() -> requests.Session:
+    sess = requests_cache.CachedSession(CACHE_DB, backend="sqlite", expire_after=CACHE_EXPIRE)
+    retry = Retry(
+        total=3,
+        backoff_factor=1.0,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=("GET",),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+    sess.mount("https://", adapter)
+    sess.headers.update({"User-Agent": USER_AGENT})
+    return sess
+
+# one TLS session reused for every state request
+_SESSION = make_session()
+
 def fetch_json(url, timeout=45, retries=3, backoff=1.5):
     for i in range(retries):
-        r = requests.get(url, timeout=timeout)
+        r = _SESSION.get(url, timeout=timeout)
         if r.ok:
             return r.json()
         sleep(backoff * (i + 1))
@@ -52,21 +90,8 @@ def fetch_counties_for_state(state_fips):
     url = CENSUS_COUNTY_URL_TMPL.format(state_fips=state_fips)
     data = fetch_json(url)
     header, rows = data[0], data[1:]
-    # header example: ["NAME","state","county"]
-    out = []
-    for row in rows:
-        name, st, county = row[0], row[1].zfill(2), row[2].zfill(3)
-        out.append({"state_fips": st, "county_fips": county, "full_label": name})
-    return out
-
-def clean_county_name(full_label):
-    # e.g., "Miami-Dade County, Florida" -> "Miami-Dade"
-    county_part = full_label.split(",")[0].strip()
-    cleaned = county_part
-    for pat in REMOVALS:
-        cleaned = re.sub(pat, "", cleaned, flags=re.IGNORECASE).strip()
-    cleaned = re.sub(r"\s{2,}", " ", cleaned)
-    return cleaned
+    # header example: ["NAME","state","county"]; rows are returned raw and cleaned column-wise in main()
+    return rows
 
 def main():
     print("Fetching states from Census…")
@@ -74,32 +99,41 @@ def main():
     print(f"Found {len(states)} states and equivalents")
 
     all_rows = []
-    for s in states:
-        st_fips = s["state_fips"]
-        st_name = s["state_name"]
-        try:
-            counties = fetch_counties_for_state(st_fips)
-        except Exception as e:
-            print(f"Warning: failed counties for {st_name} ({st_fips}): {e}")
-            continue
-
-        for c in counties:
-            row = {
-                "state_name": st_name,
-                "state_fips": st_fips,
-                "county_name": c["full_label"].split(",")[0].strip(),
-                "county_fips": c["county_fips"],
-                "county_geoid": f"{st_fips}{c['county_fips']}",
-                "county_name_clean": clean_county_name(c["full_label"]),
-            }
-            all_rows.append(row)
-
-    df = pd.DataFrame(all_rows).drop_duplicates(subset=["county_geoid"]).sort_values(
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        futs = {ex.submit(fetch_counties_for_state, s["state_fips"]): s for s in states}
+        for fut in as_completed(futs):
+            s = futs[fut]
+            try:
+                all_rows.extend(fut.result())
+            except Exception as e:
+                print(f"Warning: failed counties for {s['state_name']} ({s['state_fips']}): {e}")
+
+    df = pd.DataFrame(all_rows, columns=["full_label", "state_fips", "county_fips"])
+    df["state_fips"] = df["state_fips"].str.zfill(2)
+    df["county_fips"] = df["county_fips"].str.zfill(3)
+    df["state_name"] = df["state_fips"].map({s["state_fips"]: s["state_name"] for s in states})
+    # e.g., "Miami-Dade County, Florida" -> "Miami-Dade County" -> "Miami-Dade"
+    df["county_name"] = df["full_label"].str.split(",", n=1).str[0].str.strip()
+    df["county_geoid"] = df["state_fips"] + df["county_fips"]
+    df["county_name_clean"] = (
+        df["county_name"]
+        .str.replace(_REMOVAL_RE, "", regex=True)
+        .str.replace(_WS_RE, " ", regex=True)
+        .str.strip()
+    )
+    # state columns have ~50 distinct values each: int8 codes instead of repeated strings;
+    # categories are lexically ordered, so sorting by state_fips is unchanged
+    df = df[
+        ["state_name", "state_fips", "county_name", "county_fips", "county_geoid", "county_name_clean"]
+    ].astype({"state_name": "category", "state_fips": "category"})
+
+    df = df.drop_duplicates(subset=["county_geoid"]).sort_values(
         ["state_fips", "county_fips"]
     ).reset_index(drop=True)
 
-    Path(OUT_CSV).write_bytes(df.to_csv(index=False).encode("utf-8"))
-    Path(OUT_JSON).write_bytes(df.to_json(orient="records", indent=2).encode("utf-8"))
+    # pandas writes straight to disk; no intermediate str/bytes copy of the whole table
+    df.to_csv(OUT_CSV, index=False, encoding="utf-8")
+    df.to_json(OUT_JSON, orient="records")
 
     print(f"Saved {len(df)} counties to {OUT_CSV} and {OUT_JSON}")
 
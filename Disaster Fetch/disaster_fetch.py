@@ -2,11 +2,14 @@
 """
 Chunked, adaptive, polite GDELT county–date–disaster crawler
 - Uses location:"<County>, <State>, US" and theme:... filters (accurate + low-noise)
-- Global rate limiter with adaptive slow-down on repeated 429s
+- One OR'd theme query per county; articles are bucketed into disasters by whole-word title/URL-path keywords
+- Global rate limiter with AIMD pacing: halve the rate on a 429, creep back up after a run of successes
 - Global cool-off across the whole process after any 429
-- Chunked processing with cooldowns between chunks
-- Resumable via CSV log
-- No pandas; lightweight csv parsing
+- Chunked processing with cooldowns between chunks; counties within a chunk fetched by a small thread pool
+- Resumable via CSV log (+ a binary key file so restarts don't re-parse it while the two agree)
+- SQLite response cache so re-runs skip recently fetched queries
+- Crawl-wide article dedup: an article is emitted once per (state, county, disaster), across runs
+- No pandas; JSON responses decoded and NDJSON records encoded with orjson
 
 Output (NDJSON per line):
   {"state": "...", "county": "...", "date": "YYYY-MM-DD", "disaster": "...",
@@ -14,17 +17,24 @@ Output (NDJSON per line):
 """
 
 import csv
-import json
+import functools
+from array import array
+import hashlib
+import math
+import os
 import random
 import re
 import signal
+import sqlite3
+import sys
+import threading
 import time
-from collections import defaultdict
-from io import StringIO
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
-from urllib.parse import quote_plus
+from typing import IO, BinaryIO, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from urllib.parse import quote_plus, urlsplit
 
+import orjson
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -32,7 +42,11 @@ from urllib3.util.retry import Retry
 # ---------------- paths (keep your absolute counties path) ----------------
 COUNTIES_CSV = "/Users/macintosh-computadora/P2 472/GDELT-project-/County Fetching/us_counties.csv"
 OUT_NDJSON   = "gdelt_county_disasters.ndjson"
+COMPRESS_NDJSON = False   # True: append zstd frames to OUT_NDJSON + ".zst" instead (needs zstandard)
 LOG_CSV      = "gdelt_query_log.csv"
+CACHE_DB     = "gdelt_cache.db"
+SEEN_FILE    = "gdelt_seen_articles.bin"   # 8-byte digests of emitted (state, county, disaster, url)
+DONE_FILE    = "gdelt_query_log.bin"       # LOG_CSV byte size covered, then 8-byte digests of its keys
 
 # ---------------- knobs ----------------
 DISASTERS = ["hurricane", "flood", "tornado", "wildfire", "earthquake", "drought", "storm"]
@@ -48,6 +62,19 @@ DISASTER_THEMES = {
     "storm":      ["STORM", "SEVERE_WEATHER"],
 }
 
+# Whole-word patterns (matched against the title + URL path, never the hostname) used to bucket
+# articles from a combined multi-disaster query back into individual disasters
+DISASTER_PATTERNS = {
+    "flood":      r"\bflood(?:s|ed|ing|waters?)?\b",
+    "wildfire":   r"\b(?:wild|brush|forest|grass)?fires?\b",
+    "drought":    r"\bdroughts?\b",
+    "earthquake": r"\b(?:earthquakes?|quakes?|tremors?)\b",
+    "hurricane":  r"\b(?:hurricanes?|tropical storms?|cyclones?|typhoons?)\b",
+    "tornado":    r"\b(?:tornado(?:e?s)?|twisters?)\b",
+    "storm":      r"\b(?:(?:thunder|wind|snow|ice|winter|hail)?storms?|severe weather|hail)\b",
+}
+DISASTER_RES = {d: re.compile(p, re.IGNORECASE) for d, p in DISASTER_PATTERNS.items()}
+
 MAX_RECORDS        = 250
 RATE_LIMIT_RPM     = 9            # CHANGED: baseline ~6.7s/req, but see MIN_API_INTERVAL floor below
 RETRIES            = 8
@@ -55,6 +82,7 @@ TIMEOUT            = 30
 SLEEP_BASE         = 1.5
 BACKOFF_MAX        = 180.0
 QUERY_SCOPE        = "sourcecountry:US timespan:30d"   # CHANGED: start tight; widen in later passes
+CACHE_TTL_SEC      = 86400        # cached responses older than this are refetched (keep in step with timespan)
 
 CHUNK_SIZE         = 20           # CHANGED: smaller bursts
 CHUNK_COOLDOWN_SEC = 300          # CHANGED: 5 minutes between chunks
@@ -62,9 +90,11 @@ MAX_CHUNKS_PER_RUN = None
 
 SLEEP_BETWEEN_KEYS = 0.0
 RANDOMIZE_KEYS     = True
+MAX_WORKERS        = 8            # counties in flight per chunk; the rate limiter still spaces requests
 
 # ---- hard minimum per API guidance (≥ 1 request every ~5 seconds) ----
 MIN_API_INTERVAL   = 5.5          # CHANGED: floor gap between requests
+RATE_BURST         = 1            # requests allowed back-to-back after idle time (1 = strict spacing)
 
 # Startup warm-up to avoid rolling-window throttles after restarts
 STARTUP_WARMUP_SEC = 600          # CHANGED: 10 minutes before first call
@@ -73,33 +103,63 @@ STARTUP_WARMUP_SEC = 600          # CHANGED: 10 minutes before first call
 BASE_USER_AGENT    = "Utkarsh-GDELT-Research-Crawler/3.1"
 
 # ---------------- global rate/429 state ----------------
-_min_interval = 60.0 / max(RATE_LIMIT_RPM, 1)
-_last_request_ts = 0.0
+_next_ready_ns = 0      # theoretical arrival time of the next request (monotonic ns)
 
-_last_429_ts = 0.0
+_cooloff_until_ns = 0   # end of the global cool-off started by the latest 429 (monotonic ns)
 GLOBAL_429_COOLDOWN = 300.0
 
-_adaptive_factor = 1.0
-ADAPTIVE_MAX_FACTOR = 4.0
-ADAPTIVE_DECAY_SEC = 600.0
-_last_adapt_ts = 0.0
+# AIMD: multiplicative decrease on 429, additive increase (+1 RPM) after a streak of 200s
+_current_rpm = float(RATE_LIMIT_RPM)
+AIMD_MIN_RPM = 1.0
+AIMD_SUCCESS_STREAK = 20
+_success_streak = 0
+
+# guards the limiter slot + AIMD/429 state shared by the worker threads
+_rate_lock = threading.Lock()
 
 def rate_limit_sleep():
-    """Global limiter: enforces MIN_API_INTERVAL floor + adaptive slow-down."""
-    global _last_request_ts, _adaptive_factor, _last_adapt_ts
-    # decay adaptive factor
-    if _adaptive_factor > 1.0 and (time.monotonic() - _last_adapt_ts) > ADAPTIVE_DECAY_SEC:
-        _adaptive_factor = max(1.0, _adaptive_factor * 0.8)
-        _last_adapt_ts = time.monotonic()
-
-    now = time.monotonic()
-    base_interval = 60.0 / max(RATE_LIMIT_RPM, 1)
-    interval = max(MIN_API_INTERVAL, base_interval) * _adaptive_factor  # CHANGED: enforce floor
-    wait = interval - (now - _last_request_ts)
-    wait = max(0.0, wait) + random.uniform(0.05, 0.25)                  # small jitter
-    if wait > 0:
-        time.sleep(wait)
-    _last_request_ts = time.monotonic()
+    """
+    Global limiter: enforces MIN_API_INTERVAL floor at the current AIMD rate.
+    Lazy token bucket (GCRA): nothing refills in the background; each call just advances
+    the next-ready time by one interval and sleeps only if that runs more than RATE_BURST
+    intervals ahead of now. The lock covers this arithmetic only, never the sleep, and
+    concurrent callers get distinct slots, so no jitter is needed to stagger them.
+    A 429 pushes the schedule past the global cool-off (aimd_on_429), so workers leaving
+    it are still spaced; a slot claimed before that 429 is given up and claimed again.
+    """
+    global _next_ready_ns
+    while True:
+        with _rate_lock:
+            now_ns = time.monotonic_ns()
+            interval_ns = int(max(MIN_API_INTERVAL, 60.0 / _current_rpm) * 1e9)  # CHANGED: enforce floor
+            _next_ready_ns = max(now_ns, _next_ready_ns) + interval_ns
+            wait_ns = _next_ready_ns - now_ns - RATE_BURST * interval_ns
+            cooling = now_ns < _cooloff_until_ns
+        if cooling:
+            print(f"[rate] global cool-off active. sleeping {wait_ns / 1e9:.1f}s")
+        if wait_ns > 0:
+            time.sleep(wait_ns / 1e9)
+        if time.monotonic_ns() >= _cooloff_until_ns:
+            return
+
+def aimd_on_success() -> None:
+    global _current_rpm, _success_streak
+    with _rate_lock:
+        _success_streak += 1
+        if _success_streak >= AIMD_SUCCESS_STREAK:
+            _current_rpm = min(float(RATE_LIMIT_RPM), _current_rpm + 1.0)
+            _success_streak = 0
+
+def aimd_on_429() -> None:
+    global _current_rpm, _success_streak, _cooloff_until_ns, _next_ready_ns
+    with _rate_lock:
+        now_ns = time.monotonic_ns()
+        # 429s landing inside an active cool-off belong to the same congestion event: halve once
+        if now_ns >= _cooloff_until_ns:
+            _current_rpm = max(AIMD_MIN_RPM, _current_rpm * 0.5)
+        _cooloff_until_ns = now_ns + int(GLOBAL_429_COOLDOWN * 1e9)
+        _next_ready_ns = max(_next_ready_ns, _cooloff_until_ns)
+        _success_streak = 0
 
 # ---------------- HTTP session w/ retries for 5xx ----------------
 def make_session() -> requests.Session:
@@ -111,31 +171,137 @@ def make_session() -> requests.Session:
         allowed_methods=("GET",),
         raise_on_status=False,
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    # single host: one keep-alive connection per worker thread
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=MAX_WORKERS, max_retries=retry)
     sess.mount("https://", adapter)
     # CHANGED: randomized UA per run
-    sess.headers.update({"User-Agent": f"{BASE_USER_AGENT} ({random.randint(1000,9999)})"})
+    sess.headers.update({
+        "User-Agent": f"{BASE_USER_AGENT} ({random.randint(1000,9999)})",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip",
+    })
     return sess
 
 SESSION = make_session()
 
+# ---------------- response cache (stdlib sqlite3) ----------------
+def open_cache(path: str) -> sqlite3.Connection:
+    # shared by the worker threads; every use goes through _cache_lock
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("CREATE TABLE IF NOT EXISTS resp(k TEXT PRIMARY KEY, ts INTEGER, body BLOB)")
+    conn.commit()
+    return conn
+
+CACHE = open_cache(CACHE_DB)
+_cache_lock = threading.Lock()
+
+def cache_get(k: str) -> bytes:
+    with _cache_lock:
+        row = CACHE.execute(
+            "SELECT body FROM resp WHERE k=? AND ts>?", (k, int(time.time()) - CACHE_TTL_SEC)
+        ).fetchone()
+    return row[0] if row else b""
+
+def cache_put(k: str, body: bytes) -> None:
+    with _cache_lock:
+        CACHE.execute("INSERT OR REPLACE INTO resp(k, ts, body) VALUES (?, ?, ?)", (k, int(time.time()), body))
+        CACHE.commit()
+
+def key64(*parts: str) -> int:
+    """64-bit blake2b digest of the parts joined with '|' (compact set key for resume/dedup)."""
+    return int.from_bytes(hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=8).digest(), "little")
+
+# ---------------- key files: append-only arrays of key64 digests ----------------
+def read_key_file(path: str) -> array:
+    keys = array("Q")
+    p = Path(path)
+    if p.exists():
+        data = p.read_bytes()
+        keys.frombytes(data[: len(data) // 8 * 8])  # ignore a torn trailing record
+    return keys
+
+def append_key_file(path: str, keys: List[int]) -> None:
+    if keys:
+        with open(path, "ab") as f:
+            f.write(array("Q", keys).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+# ---------------- crawl-wide article dedup ----------------
+# Keys are 64-bit blake2b digests kept in an exact set (no false positives dropping real
+# articles); SEEN_FILE is an append-only array of them, extended at every chunk sync and
+# reset together with LOG_CSV. NDJSON that reached disk mid-chunk before a crash has no
+# digests saved yet, so those articles are emitted again by the next run.
+_seen_articles: set = set()
+_new_seen: List[int] = []
+
+def load_seen(path: str) -> None:
+    _seen_articles.update(read_key_file(path))
+
+def save_seen(path: str) -> None:
+    """Append digests added since the last call (main thread, while no worker is running)."""
+    append_key_file(path, _new_seen)
+    _new_seen.clear()
+
+def first_sighting(state: str, county: str, disaster: str, url: str) -> bool:
+    """True (and remembered) the first time this article is seen for this county + disaster."""
+    key = key64(state, county, disaster, url)
+    if key in _seen_articles:
+        return False
+    _seen_articles.add(key)
+    _new_seen.append(key)
+    return True
+
 # ---------------- utils ----------------
-def chunked(iterable: Iterable, size: int):
-    buf = []
-    for item in iterable:
-        buf.append(item)
-        if len(buf) >= size:
-            yield buf
-            buf = []
-    if buf:
-        yield buf
-
-def disaster_theme_clause(disaster: str) -> str:
-    themes = DISASTER_THEMES.get(disaster, [])
-    if not themes:
-        return disaster
-    ors = " OR ".join(f'theme:{t}' for t in themes)
-    return f"({ors})"
+# urlsplit raises ValueError on malformed URLs (e.g. an unclosed '[' host); article URLs come
+# straight from the API, so a bad one degrades to "" instead of killing the worker
+def url_host(url: str) -> str:
+    try:
+        return urlsplit(url).hostname or ""
+    except ValueError:
+        return ""
+
+def url_path(url: str) -> str:
+    try:
+        return urlsplit(url).path
+    except ValueError:
+        return ""
+
+@functools.lru_cache(maxsize=256)
+def disaster_theme_clause(*disasters: str) -> str:
+    """
+    Single flat OR over the theme tokens of every given disaster
+    (GDELT does not support nested parentheses).
+    """
+    terms: List[str] = []
+    for d in disasters:
+        themes = DISASTER_THEMES.get(d, [])
+        if themes:
+            terms.extend(f'theme:{t}' for t in themes)
+        else:
+            terms.append(d)
+    if len(terms) == 1:
+        return terms[0]
+    return f"({' OR '.join(terms)})"
+
+def disaster_classifier(disasters: Sequence[str]) -> Callable[[str, str], List[str]]:
+    """
+    Return classify(title, url) -> list of disasters the article belongs to.
+    With a single disaster the query itself already filtered by theme, so every article counts.
+    """
+    if len(disasters) == 1:
+        only = [disasters[0]]
+        return lambda title, url: only
+
+    pats = [(d, DISASTER_RES.get(d) or re.compile(rf"\b{re.escape(d)}\b", re.IGNORECASE))
+            for d in disasters]
+
+    def classify(title: str, url: str) -> List[str]:
+        # URL slugs join words with '-', '/', '_'; '_' is a word character, so split on it too
+        hay = f"{title} {url_path(url).replace('_', ' ')}"
+        return [d for d, pat in pats if pat.search(hay)]
+
+    return classify
 
 def county_query_string(county_name_clean: str, state_name: str) -> str:
     """
@@ -158,168 +324,236 @@ def county_query_string(county_name_clean: str, state_name: str) -> str:
 
     return f'location:"{label}, {state_name}, US"'
 
-def gdelt_url(query: str) -> str:
-    q = f"{query} {QUERY_SCOPE}".strip()
-    return (
-        "https://api.gdeltproject.org/api/v2/doc/doc"
-        f"?query={quote_plus(q)}&mode=artlist&maxrecords={MAX_RECORDS}&format=csv&sort=datedesc"
-    )
+# fixed URL pieces, built once
+_URL_BASE = "https://api.gdeltproject.org/api/v2/doc/doc?query="
+_URL_TAIL = f"+{quote_plus(QUERY_SCOPE)}&mode=artlist&maxrecords={MAX_RECORDS}&format=json&sort=datedesc"
+
+def gdelt_url(query: str, encoded_loc: str) -> str:
+    """
+    `encoded_loc` is the county's location clause, quote_plus'ed once by load_counties.
+    quote_plus works per character, so joining the encoded parts with "+" gives the same
+    URL (and cache key) as encoding f"{query} {location} {QUERY_SCOPE}" in one go.
+    """
+    return f"{_URL_BASE}{quote_plus(query)}+{encoded_loc}{_URL_TAIL}"
 
 def normalize_date(val) -> str:
-    if val is None:
-        return ""
-    s = str(val)
-    m = re.match(r"^(\d{8})", s)
-    if not m:
-        return ""
-    ymd = m.group(1)
-    return f"{ymd[0:4]}-{ymd[4:6]}-{ymd[6:8]}"
+    # DOC API seendate is YYYYMMDDTHHMMSSZ; fixed-position slice, no regex needed
+    s = str(val) if val is not None else ""
+    if len(s) >= 8 and s[:8].isdigit():
+        return f"{s[:4]}-{s[4:6]}-{s[6:8]}"
+    return ""
 
 # ---------------- parsing & grouping (no pandas) ----------------
-def rows_from_csv_text(csv_text: str, state: str, county: str, disaster: str) -> List[Dict]:
-    if not csv_text or "DocumentIdentifier" not in csv_text:
+def rows_from_json_bytes(buf: bytes, state: str, county: str,
+                         classify: Callable[[str, str], List[str]]) -> List[Dict]:
+    if not buf:
+        return []
+    try:
+        data = orjson.loads(buf)
+    except orjson.JSONDecodeError:
+        return []
+    if not isinstance(data, dict):
         return []
 
-    reader = csv.DictReader(StringIO(csv_text))
+    # the API returns sort=datedesc, so each date forms one contiguous run: emit its
+    # per-disaster groups when the date changes instead of grouping + sorting at the end
+    out: List[Dict] = []
     seen_urls = set()
-    by_date: Dict[str, List[Dict]] = defaultdict(list)
+    cur_date = ""
+    cur_groups: Dict[str, List[Dict]] = {}
 
-    for row in reader:
-        url = (row.get("DocumentIdentifier") or "").strip()
+    def emit() -> None:
+        for disaster, arts in cur_groups.items():
+            out.append({
+                "state": state,
+                "county": county,
+                "date": cur_date,
+                "disaster": disaster,
+                "articles": arts,
+            })
+
+    for a in data.get("articles") or []:
+        url = (a.get("url") or "").strip()
         if not url or url in seen_urls:
             continue
         seen_urls.add(url)
 
-        date_str = normalize_date(row.get("Date"))
+        date_str = normalize_date(a.get("seendate"))
         if not date_str:
             continue
 
-        title = row.get("Title") or ""
-        source = row.get("SourceCommonName") or ""
+        title = a.get("title") or ""
+        source = a.get("domain") or ""
         if not source:
-            m = re.search(r"https?://([^/]+)", url)
-            if m:
-                source = m.group(1)
+            source = url_host(url)
 
-        by_date[date_str].append({"title": title, "url": url, "source": source})
+        if date_str != cur_date:
+            emit()
+            cur_date, cur_groups = date_str, {}
 
-    out = []
-    for dte, arts in by_date.items():
-        if arts:
-            out.append({
-                "state": state,
-                "county": county,
-                "date": dte,
-                "disaster": disaster,
-                "articles": arts,
-            })
+        art = {"title": title, "url": url, "source": source}
+        for disaster in classify(title, url):
+            if first_sighting(state, county, disaster, url):
+                cur_groups.setdefault(disaster, []).append(art)
 
-    out.sort(key=lambda r: r["date"], reverse=True)
+    emit()
     return out
 
 # ---------------- file I/O helpers ----------------
-def append_ndjson(path: str, records: List[Dict]) -> None:
-    if not records:
-        return
-    with open(path, "a", encoding="utf-8") as f:
-        for rec in records:
-            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
-
-def log_progress(path: str, state: str, county: str, disaster: str, n_dates: int, n_articles: int) -> None:
-    p = Path(path)
-    need_header = not p.exists() or p.stat().st_size == 0
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        if need_header:
-            w.writerow(["state", "county", "disaster", "date_groups", "articles"])
-        w.writerow([state, county, disaster, n_dates, n_articles])
-
-def load_done_keys(log_csv: str) -> set:
-    done = set()
+# Both outputs are opened once in main() and flushed + fsync'd at chunk boundaries.
+LOG_HEADER = ["state", "county", "disaster", "date_groups", "articles"]
+WRITE_BUFFER = 1 << 16   # output buffer size; a chunk's writes normally reach disk at the sync
+
+def open_ndjson_out() -> Tuple[BinaryIO, str]:
+    """Open the dataset for appending (binary: orjson emits UTF-8 bytes); returns (file, path)."""
+    if not COMPRESS_NDJSON:
+        return open(OUT_NDJSON, "ab", buffering=WRITE_BUFFER), OUT_NDJSON
+    import zstandard  # optional dependency, only needed with COMPRESS_NDJSON
+    path = OUT_NDJSON + ".zst"
+    # each flush (chunk sync) ends a zstd block, so everything synced stays decodable;
+    # each run appends a new frame (read back with read_across_frames=True or zstd -d)
+    return zstandard.ZstdCompressor(level=6, threads=-1).stream_writer(open(path, "ab")), path
+
+def append_ndjson(f: BinaryIO, records: List[Dict]) -> None:
+    # one write per batch: zstd stream writers don't implement writelines()
+    f.write(b"".join(orjson.dumps(rec) + b"\n" for rec in records))
+
+def log_progress(w, state: str, county: str, disaster: str, n_dates: int, n_articles: int) -> None:
+    w.writerow([state, county, disaster, n_dates, n_articles])
+
+def sync_files(*files: IO) -> None:
+    for f in files:
+        f.flush()
+        os.fsync(f.fileno())
+
+def load_done_keys(log_csv: str, done_file: str) -> Set[int]:
+    """
+    key64(state, county, disaster) of every logged key: one int per entry instead of a 3-str tuple.
+    Read from done_file (no CSV parse) only while its header still matches the log: same byte
+    size and the key file no older than the log. Otherwise (log edited by hand, crash between
+    the log sync and the key-file update, no key file yet) the log is parsed and the key file
+    rewritten from it. A missing/empty log means a fresh crawl, so the key file is reset.
+    """
     p = Path(log_csv)
     if not p.exists() or p.stat().st_size == 0:
-        return done
+        Path(done_file).unlink(missing_ok=True)
+        return set()
+    st = p.stat()
+    keys = read_key_file(done_file)
+    if keys and keys[0] == st.st_size and Path(done_file).stat().st_mtime >= st.st_mtime:
+        return set(keys[1:])
+    done = load_done_keys_csv(log_csv)
+    write_done_file(done_file, st.st_size, done)
+    return done
+
+def write_done_file(path: str, csv_size: int, keys: Iterable[int]) -> None:
+    with open(path, "wb") as f:
+        f.write(array("Q", [csv_size, *keys]).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+def extend_done_file(path: str, csv_size: int, keys: List[int]) -> None:
+    """Append keys logged since the last sync, then stamp the header with the synced log size."""
+    if not Path(path).exists():
+        write_done_file(path, csv_size, keys)
+        return
+    with open(path, "r+b") as f:
+        f.seek(0, os.SEEK_END)
+        f.write(array("Q", keys).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+        # header last: a crash before this leaves it stale, so the next run rebuilds from the log
+        f.seek(0)
+        f.write(array("Q", [csv_size]).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+def load_done_keys_csv(log_csv: str) -> Set[int]:
+    done: Set[int] = set()
     with open(log_csv, newline="", encoding="utf-8") as f:
-        rd = csv.DictReader(f)
-        if not rd.fieldnames:
+        rd = csv.reader(f)
+        header = next(rd, None)
+        if not header:
             return done
-        lower = {h.strip().lower(): h for h in rd.fieldnames}
-        s, c, d = lower.get("state"), lower.get("county"), lower.get("disaster")
-        if not (s and c and d):
+        lower = [h.strip().lower() for h in header]
+        if not all(col in lower for col in ("state", "county", "disaster")):
             return done
+        # positional access: no per-row dict like DictReader
+        i_s, i_c, i_d = lower.index("state"), lower.index("county"), lower.index("disaster")
+        width = max(i_s, i_c, i_d) + 1
         for row in rd:
-            st = (row.get(s, "") or "").strip()
-            co = (row.get(c, "") or "").strip()
-            di = (row.get(d, "") or "").strip()
+            if len(row) < width:
+                continue
+            st, co, di = row[i_s].strip(), row[i_c].strip(), row[i_d].strip()
             if st and co and di:
-                done.add((st, co, di))
+                done.add(key64(st, co, di))
     return done
 
-def load_counties(path: str) -> List[Tuple[str, str]]:
-    rows: List[Tuple[str, str]] = []
+def load_counties(path: str) -> List[Tuple[str, str, str]]:
+    """(state, county_name_clean, URL-encoded location clause) per county; the clause is built and encoded once here."""
+    rows: List[Tuple[str, str, str]] = []
     with open(path, newline="", encoding="utf-8") as f:
-        rd = csv.DictReader(f)
-        lower = {h.strip().lower(): h for h in (rd.fieldnames or [])}
-        s_col = lower.get("state_name") or lower.get("state")
-        c_col = lower.get("county_name_clean") or lower.get("countyclean") or lower.get("county")
-        if not (s_col and c_col):
+        rd = csv.reader(f)
+        lower = {h.strip().lower(): i for i, h in enumerate(next(rd, []))}
+        s_col = lower.get("state_name", lower.get("state"))
+        c_col = lower.get("county_name_clean", lower.get("countyclean", lower.get("county")))
+        if s_col is None or c_col is None:
             raise SystemExit("us_counties.csv must include 'state_name' and 'county_name_clean' columns.")
+        # positional access, as in load_done_keys
+        width = max(s_col, c_col) + 1
         for r in rd:
-            s = (r.get(s_col, "") or "").strip()
-            c = (r.get(c_col, "") or "").strip()
+            if len(r) < width:
+                continue
+            s = sys.intern(r[s_col].strip())
+            c = r[c_col].strip()
             if s and c:
-                rows.append((s, c))
+                rows.append((s, c, quote_plus(county_query_string(c, s))))
     return rows
 
 # ---------------- fetch with global 429 handling ----------------
-def fetch_gdelt(query: str) -> str:
+def decorrelated_backoff(prev: float) -> float:
+    """AWS-style decorrelated jitter: next sleep drawn from [SLEEP_BASE, 3 * previous sleep]."""
+    return min(BACKOFF_MAX, random.uniform(SLEEP_BASE, prev * 3))
+
+def fetch_gdelt(url: str) -> bytes:
     """
-    Return the raw CSV string from the DOC API for a given query.
+    Return the raw JSON body (bytes) from the DOC API for a request URL (see gdelt_url), b"" on failure.
     Adds:
       - global cool-off if any earlier request saw a 429
-      - adaptive throttle bumps on 429
+      - AIMD rate updates (see aimd_on_success / aimd_on_429)
     """
-    global _last_429_ts, _adaptive_factor, _last_adapt_ts
+    # hot-loop constants as locals
+    session, timeout = SESSION, TIMEOUT
 
-    url = gdelt_url(query)
     backoff = SLEEP_BASE
     last_err = None
     streak_429 = 0
 
     for attempt in range(1, RETRIES + 1):
-        # global RPM limiter
+        # global RPM limiter (also holds every worker through the cool-off after any 429)
         rate_limit_sleep()
 
-        # if we recently saw a 429 anywhere, honor a global cool-off
-        since = time.monotonic() - _last_429_ts
-        if since < GLOBAL_429_COOLDOWN:
-            sleep_s = GLOBAL_429_COOLDOWN - since + random.uniform(0.1, 0.5)
-            print(f"[rate] global cool-off active. sleeping {sleep_s:.1f}s")
-            time.sleep(sleep_s)
-
         try:
-            r = SESSION.get(url, timeout=TIMEOUT)
-            txt = r.text or ""
+            r = session.get(url, timeout=timeout)
+            body = r.content or b""
 
-            if r.status_code == 200 and "DocumentIdentifier" in txt and len(txt) > 100:
+            if r.status_code == 200 and b'"articles"' in body:
+                aimd_on_success()
                 time.sleep(2.0)  # CHANGED: tiny success delay to avoid edge hits
-                return txt
+                return body
 
             if r.status_code == 429:
-                _last_429_ts = time.monotonic()
                 streak_429 += 1
+                aimd_on_429()
 
-                _adaptive_factor = min(ADAPTIVE_MAX_FACTOR, _adaptive_factor * 1.25)
-                _last_adapt_ts = time.monotonic()
-
+                backoff = decorrelated_backoff(backoff)
                 ra = r.headers.get("Retry-After")
                 try:
-                    sleep_s = float(ra) if ra else backoff + random.uniform(0, 0.5)
+                    sleep_s = float(ra) if ra else backoff
                 except Exception:
-                    sleep_s = backoff + random.uniform(0, 0.5)
+                    sleep_s = backoff
                 print(f"[rate] 429 attempt {attempt}. sleeping {sleep_s:.1f}s")
                 time.sleep(sleep_s)
-                backoff = min(backoff * 2, BACKOFF_MAX)
 
                 if streak_429 >= 3:
                     cool = 300 + random.uniform(0, 60)
@@ -329,23 +563,40 @@ def fetch_gdelt(query: str) -> str:
                 continue
 
             if r.status_code in (502, 503, 504):
-                sleep_s = backoff + random.uniform(0, 0.5)
-                print(f"[rate] {r.status_code} transient. sleeping {sleep_s:.1f}s")
-                time.sleep(sleep_s)
-                backoff = min(backoff * 2, BACKOFF_MAX)
+                backoff = decorrelated_backoff(backoff)
+                print(f"[rate] {r.status_code} transient. sleeping {backoff:.1f}s")
+                time.sleep(backoff)
                 continue
 
-            last_err = f"status {r.status_code}, len={len(txt)}"
+            last_err = f"status {r.status_code}, len={len(body)}"
         except Exception as e:
             last_err = str(e)
 
         # generic retry
-        sleep_s = backoff + random.uniform(0, 0.5)
-        time.sleep(sleep_s)
-        backoff = min(backoff * 2, BACKOFF_MAX)
-
-    print(f"[warn] query failed after {RETRIES} tries. reason={last_err} q={query[:120]}")
-    return ""
+        backoff = decorrelated_backoff(backoff)
+        time.sleep(backoff)
+
+    print(f"[warn] query failed after {RETRIES} tries. reason={last_err} url={url[:200]}")
+    return b""
+
+def fetch_county(state: str, county: str, encoded_loc: str, todo: List[str]) -> Optional[List[Dict]]:
+    """Worker: one OR'd query for the county's pending disasters -> NDJSON records (None if stopped)."""
+    if not _running:
+        return None
+    # response cache keyed by the full request URL (skips the network on a fresh hit)
+    url = gdelt_url(disaster_theme_clause(*todo), encoded_loc)
+    cache_key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    payload = cache_get(cache_key)
+    fresh = not payload
+    if fresh:
+        payload = fetch_gdelt(url)
+        if SLEEP_BETWEEN_KEYS > 0:
+            time.sleep(SLEEP_BETWEEN_KEYS)
+    rows = rows_from_json_bytes(payload, state=state, county=county, classify=disaster_classifier(todo))
+    # cache only a body that parsed: a bad one must not be replayed on every restart
+    if fresh and payload:
+        cache_put(cache_key, payload)
+    return rows
 
 # ---------------- graceful Ctrl-C ----------------
 _running = True
@@ -363,55 +614,77 @@ def main():
     counties = load_counties(COUNTIES_CSV)
     print(f"loaded {len(counties)} counties from {COUNTIES_CSV}")
 
-    # build all keys
-    all_keys = [(s, c, d) for (s, c) in counties for d in DISASTERS]
-
-    # resume
-    done = load_done_keys(LOG_CSV)
-    pending = [k for k in all_keys if k not in done]
+    # resume: a county is pending while any of its (state, county, disaster) keys is unlogged;
+    # all of its remaining disasters go out as one OR'd query
+    log_p = Path(LOG_CSV)
+    need_header = not log_p.exists() or log_p.stat().st_size == 0
+    done = load_done_keys(LOG_CSV, DONE_FILE)
+    if need_header:
+        # fresh crawl: digests from an earlier crawl would suppress every article it re-fetches
+        Path(SEEN_FILE).unlink(missing_ok=True)
+    load_seen(SEEN_FILE)
+    pending = []
+    for (s, c, encoded_loc) in counties:
+        todo = [d for d in DISASTERS if key64(s, c, d) not in done]
+        if todo:
+            pending.append((s, c, encoded_loc, todo))
     if RANDOMIZE_KEYS:
         random.shuffle(pending)
 
-    print(f"pending keys to process: {len(pending)}")
+    print(f"pending counties to process: {len(pending)} ({sum(len(t) for *_, t in pending)} keys)")
 
     # CHANGED: startup warm-up to avoid rolling-window 429 after restart
     if pending:
         print(f"[start] warm-up sleep {STARTUP_WARMUP_SEC}s to avoid rolling-window 429…")
         time.sleep(STARTUP_WARMUP_SEC)
 
-    chunks_iter = list(chunked(pending, CHUNK_SIZE))
+    n_chunks = math.ceil(len(pending) / CHUNK_SIZE)
     if MAX_CHUNKS_PER_RUN is not None:
-        chunks_iter = chunks_iter[:MAX_CHUNKS_PER_RUN]
-
-    for idx, ch in enumerate(chunks_iter, 1):
-        if not _running:
-            break
-        print(f"[chunk {idx}/{len(chunks_iter)}] processing {len(ch)} keys…")
+        n_chunks = min(n_chunks, MAX_CHUNKS_PER_RUN)
+    # pending is a list: slice the chunks directly (n_chunks already honors MAX_CHUNKS_PER_RUN)
+    chunks = [pending[i:i + CHUNK_SIZE] for i in range(0, n_chunks * CHUNK_SIZE, CHUNK_SIZE)]
+
+    # workers only fetch + parse; all file writes stay on this thread
+    fj, out_path = open_ndjson_out()
+    with fj, \
+         open(LOG_CSV, "a", newline="", encoding="utf-8", buffering=WRITE_BUFFER) as fl, \
+         ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        log_w = csv.writer(fl)
+        if need_header:
+            log_w.writerow(LOG_HEADER)
+        done_new: List[int] = []  # keys logged since the last sync, for DONE_FILE
 
-        for (state, county_clean, disaster) in ch:
+        for idx, ch in enumerate(chunks, 1):
             if not _running:
                 break
-
-            loc_query = county_query_string(county_clean, state)
-            disaster_clause = disaster_theme_clause(disaster)
-            q = f"{disaster_clause} {loc_query}"
-
-            csv_text = fetch_gdelt(q)
-            entries = rows_from_csv_text(csv_text, state=state, county=county_clean, disaster=disaster)
-
-            append_ndjson(OUT_NDJSON, entries)
-            n_dates = len(entries)
-            n_articles = sum(len(e["articles"]) for e in entries)
-            log_progress(LOG_CSV, state, county_clean, disaster, n_dates, n_articles)
-
-            if SLEEP_BETWEEN_KEYS > 0:
-                time.sleep(SLEEP_BETWEEN_KEYS)
-
-        if idx < len(chunks_iter) and _running:
-            print(f"[chunk {idx}] cool-down for {CHUNK_COOLDOWN_SEC}s…")
-            time.sleep(CHUNK_COOLDOWN_SEC)
-
-    print("done. dataset appended to", OUT_NDJSON)
+            print(f"[chunk {idx}/{n_chunks}] processing {len(ch)} counties…")
+
+            futures = {ex.submit(fetch_county, *item): item for item in ch}
+            for fut in as_completed(futures):
+                state, county_clean, _, todo = futures[fut]
+                entries = fut.result()
+                if entries is None:
+                    continue  # stopped before fetching: leave its keys pending
+
+                append_ndjson(fj, entries)
+                # one log row per disaster keeps the resume log format unchanged
+                done_new.extend(key64(state, county_clean, d) for d in todo)
+                for disaster in todo:
+                    mine = [e for e in entries if e["disaster"] == disaster]
+                    n_dates = len(mine)
+                    n_articles = sum(len(e["articles"]) for e in mine)
+                    log_progress(log_w, state, county_clean, disaster, n_dates, n_articles)
+
+            sync_files(fj, fl)
+            extend_done_file(DONE_FILE, os.fstat(fl.fileno()).st_size, done_new)
+            done_new.clear()
+            save_seen(SEEN_FILE)
+
+            if idx < n_chunks and _running:
+                print(f"[chunk {idx}] cool-down for {CHUNK_COOLDOWN_SEC}s…")
+                time.sleep(CHUNK_COOLDOWN_SEC)
+
+    print("done. dataset appended to", out_path)
     print("progress logged to", LOG_CSV)
 
 if __name__ == "__main__":
@@ -7,16 +7,24 @@ Fixes:
 - Use full ISO datetimes in $filter
 - Add $format=json
 - On 400, print FEMA error body; also retry once without $orderby
+- Pooled keep-alive session; row count fetched up front, then all pages fetched concurrently
+- One record per (disasterNumber, county FIPS); FEMA repeats counties per program/amendment
 """
 
 import argparse
 import csv
-import json
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Tuple, Optional
+from typing import Callable, Dict, Iterator, List, Set, Tuple, Optional
+from urllib.parse import urlencode
 
+import orjson
+import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 
 # ---- your absolute counties CSV path (kept as requested) ----
 COUNTIES_CSV = "/Users/macintosh-computadora/P2 472/GDELT-project-/County Fetching/us_counties.csv"
@@ -28,6 +36,8 @@ TIMEOUT     = 30
 SLEEP_BETWEEN = 0.20
 BACKOFF_BASE  = 1.5
 BACKOFF_MAX   = 20.0
+WINDOW        = 8      # pages in flight at once (one pooled connection each)
+PARQUET_BATCH_ROWS = 10_000  # rows per Parquet row group with --parquet
 
 # map FEMA incidentType labels to your normalized disaster names
 NORMALIZE = {
@@ -45,55 +55,65 @@ NORMALIZE = {
     "drought": "drought",
 }
 
+# fallback for labels not in NORMALIZE: one regex scan finds every keyword present, then the
+# first bucket in this priority order wins ("fire" also covers "wildfire")
+_KW_PRIORITY = [
+    ("storm", "storm"),
+    ("flood", "flood"),
+    ("fire", "wildfire"),
+    ("hurricane", "hurricane"),
+    ("typhoon", "hurricane"),
+    ("cyclone", "hurricane"),
+    ("tornado", "tornado"),
+    ("earthquake", "earthquake"),
+    ("drought", "drought"),
+]
+_KW_RE = re.compile("|".join(kw for kw, _ in _KW_PRIORITY))
+
 def load_fips_mapping(path: str) -> Dict[str, Tuple[str, str]]:
     """
     Build map: 5-digit county FIPS -> (state_name, county_name_clean)
     Accepts either:
       - county_geoid (e.g., 1001 for 01001), or
       - state_fips + county_fips (e.g., 1 + 1 -> 01001)
+    Parsed with pandas' C reader; FIPS normalization is done column-wise.
     """
-    m: Dict[str, Tuple[str, str]] = {}
-    with open(path, newline="", encoding="utf-8") as f:
-        rd = csv.DictReader(f)
-        lowers = {h.strip().lower(): h for h in (rd.fieldnames or [])}
-
-        s_name = lowers.get("state_name") or lowers.get("state")
-        c_clean = lowers.get("county_name_clean") or lowers.get("countyclean") or lowers.get("county")
-
-        # columns available in your file
-        geoid_col = lowers.get("county_geoid")
-        s_fips_col = lowers.get("state_fips")
-        c_fips_col = lowers.get("county_fips")
-
-        if not (s_name and c_clean and (geoid_col or (s_fips_col and c_fips_col))):
-            raise SystemExit(
-                "counties file must have state_name, county_name_clean, and either county_geoid "
-                "or both state_fips + county_fips"
-            )
-
-        for r in rd:
-            state = (r.get(s_name, "") or "").strip()
-            county = (r.get(c_clean, "") or "").strip()
-
-            fips5 = None
-            if geoid_col and r.get(geoid_col) not in (None, ""):
-                # county_geoid like 1001 → "01001"
-                fips5 = str(r[geoid_col]).strip()
-                # tolerate ints
-                if fips5.isdigit():
-                    fips5 = fips5.zfill(5)
-                else:
-                    fips5 = re.sub(r"\D", "", fips5).zfill(5)
-            elif s_fips_col and c_fips_col:
-                s2 = str(r.get(s_fips_col, "") or "").strip()
-                c3 = str(r.get(c_fips_col, "") or "").strip()
-                s2 = re.sub(r"\D", "", s2).zfill(2)
-                c3 = re.sub(r"\D", "", c3).zfill(3)
-                if s2 and c3 and s2.isdigit() and c3.isdigit():
-                    fips5 = s2 + c3
-
-            if fips5 and state and county:
-                m[fips5] = (state, county)
+    wanted = {"state_name", "state", "county_name_clean", "countyclean", "county",
+              "county_geoid", "state_fips", "county_fips"}
+    df = pd.read_csv(path, dtype=str, keep_default_na=False,
+                     usecols=lambda h: h.strip().lower() in wanted)
+    lowers = {h.strip().lower(): h for h in df.columns}
+
+    s_name = lowers.get("state_name") or lowers.get("state")
+    c_clean = lowers.get("county_name_clean") or lowers.get("countyclean") or lowers.get("county")
+
+    # columns available in your file
+    geoid_col = lowers.get("county_geoid")
+    s_fips_col = lowers.get("state_fips")
+    c_fips_col = lowers.get("county_fips")
+
+    if not (s_name and c_clean and (geoid_col or (s_fips_col and c_fips_col))):
+        raise SystemExit(
+            "counties file must have state_name, county_name_clean, and either county_geoid "
+            "or both state_fips + county_fips"
+        )
+
+    state = df[s_name].str.strip()
+    county = df[c_clean].str.strip()
+
+    fips5 = None
+    if s_fips_col and c_fips_col:
+        s2 = df[s_fips_col].str.replace(r"\D", "", regex=True).str.zfill(2)
+        c3 = df[c_fips_col].str.replace(r"\D", "", regex=True).str.zfill(3)
+        fips5 = s2 + c3
+    if geoid_col:
+        # county_geoid like 1001 → "01001"; rows with an empty geoid fall back to state+county FIPS
+        geoid = df[geoid_col].str.strip()
+        from_geoid = geoid.str.replace(r"\D", "", regex=True).str.zfill(5)
+        fips5 = from_geoid if fips5 is None else from_geoid.where(geoid != "", fips5)
+
+    keep = (fips5 != "") & (state != "") & (county != "")
+    m = dict(zip(fips5[keep], zip(state[keep], county[keep])))
 
     if not m:
         raise SystemExit("no county FIPS keys were built; check CSV column names/values")
@@ -104,19 +124,17 @@ def norm_date(date_str: str) -> Optional[str]:
         return None
     return date_str[:10]  # YYYY-MM-DD from ISO timestamp
 
+@lru_cache(maxsize=64)
 def norm_disaster(label: str) -> Optional[str]:
     if not label:
         return None
     key = label.strip().lower()
     if key in NORMALIZE:
         return NORMALIZE[key]
-    if "storm" in key: return "storm"
-    if "flood" in key: return "flood"
-    if "fire" in key or "wildfire" in key: return "wildfire"
-    if "hurricane" in key or "typhoon" in key or "cyclone" in key: return "hurricane"
-    if "tornado" in key: return "tornado"
-    if "earthquake" in key: return "earthquake"
-    if "drought" in key: return "drought"
+    hits = set(_KW_RE.findall(key))
+    for kw, bucket in _KW_PRIORITY:
+        if kw in hits:
+            return bucket
     return "storm"
 
 def build_filter(start_iso: str, end_iso: Optional[str], state_abbr: Optional[str], fema_types: Optional[str]) -> str:
@@ -137,9 +155,19 @@ def build_filter(start_iso: str, end_iso: Optional[str], state_abbr: Optional[st
             parts.append(f"({ors})")
     return " and ".join(parts)
 
-def fetch_page(params: dict) -> dict:
+# ---------------- HTTP session (keep-alive + pooled connections) ----------------
+def make_session() -> requests.Session:
+    sess = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=WINDOW)
+    sess.mount("https://", adapter)
+    return sess
+
+SESSION = make_session()
+
+def fetch_page(params: dict, url: Optional[str] = None) -> dict:
     """
     GET with retries; on 400, print server's error; retry once without $orderby (some gateways reject it).
+    `url` is `params` already encoded onto BASE_URL (see page_fetcher); the 400 fallback re-encodes params.
     """
     backoff = BACKOFF_BASE
     last_err_text = None
@@ -147,18 +175,21 @@ def fetch_page(params: dict) -> dict:
 
     for _ in range(RETRIES):
         try:
-            r = requests.get(BASE_URL, params=params, timeout=TIMEOUT)
+            if url:
+                r = SESSION.get(url, timeout=TIMEOUT)
+            else:
+                r = SESSION.get(BASE_URL, params=params, timeout=TIMEOUT)
             if r.status_code == 200:
-                return r.json()
+                return orjson.loads(r.content)
             if r.status_code == 400:
                 last_err_text = r.text
                 if not tried_without_order and "$orderby" in params:
                     p2 = dict(params)
                     p2.pop("$orderby", None)
                     tried_without_order = True
-                    r2 = requests.get(BASE_URL, params=p2, timeout=TIMEOUT)
+                    r2 = SESSION.get(BASE_URL, params=p2, timeout=TIMEOUT)
                     if r2.status_code == 200:
-                        return r2.json()
+                        return orjson.loads(r2.content)
                     if r2.status_code == 400:
                         last_err_text = r2.text
                 time.sleep(backoff)
@@ -180,13 +211,141 @@ def fetch_page(params: dict) -> dict:
         print("[warn] fetch_page failed after retries.")
     return {"DisasterDeclarationsSummaries": []}
 
-def write_log_row(log_path: Path, row):
-    need_header = not log_path.exists()
-    with log_path.open("a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        if need_header:
-            w.writerow(["date", "state", "county_fips", "county", "incidentType", "disaster", "disasterNumber"])
-        w.writerow(row)
+def count_rows(params: dict) -> Optional[int]:
+    """Total rows matching the filter via $inlinecount (None if the API didn't report it)."""
+    probe = {**params, "$top": 1, "$skip": 0, "$inlinecount": "allpages", "$select": "disasterNumber"}
+    count = (fetch_page(probe).get("metadata") or {}).get("count")
+    try:
+        return int(count)
+    except (TypeError, ValueError):
+        return None
+
+def page_fetcher(params: dict) -> Callable[[int], dict]:
+    """fetch_page for a given $skip; the fixed part of the query string is encoded once."""
+    base_url = f"{BASE_URL}?{urlencode({k: v for k, v in params.items() if k != '$skip'})}&%24skip="
+    return lambda sk: fetch_page({**params, "$skip": sk}, base_url + str(sk))
+
+def iter_pages(ex: ThreadPoolExecutor, params: dict, max_pages: Optional[int]) -> Iterator[List[dict]]:
+    """
+    Yield each page's rows in $skip order.
+    With a known row count every offset is dispatched at once (WINDOW workers bound the
+    concurrency); otherwise fall back to fetching WINDOW pages at a time until a short page.
+    """
+    total = count_rows(params)
+    fetch = page_fetcher(params)
+    if total is not None:
+        n_pages = -(-total // PAGE_SIZE)
+        if max_pages:
+            n_pages = min(n_pages, max_pages)
+        print(f"{total} matching rows -> {n_pages} page(s)")
+        skips = [i * PAGE_SIZE for i in range(n_pages)]
+        for data in ex.map(fetch, skips):
+            yield data.get("DisasterDeclarationsSummaries", [])
+        return
+
+    pages = 0
+    base_skip = 0
+    while True:
+        n = WINDOW if not max_pages else min(WINDOW, max_pages - pages)
+        skips = [base_skip + i * PAGE_SIZE for i in range(n)]
+        for data in ex.map(fetch, skips):
+            rows = data.get("DisasterDeclarationsSummaries", [])
+            if not rows:
+                return
+            yield rows
+            pages += 1
+            if len(rows) < PAGE_SIZE or (max_pages and pages >= max_pages):
+                return
+        base_skip += n * PAGE_SIZE
+        time.sleep(SLEEP_BETWEEN)
+
+LOG_HEADER = ["date", "state", "county_fips", "county", "incidentType", "disaster", "disasterNumber"]
+
+def write_rows(rows: List[dict], fips_map: Dict[str, Tuple[str, str]], out_f, log_w,
+               seen: Set[Tuple[object, str]]) -> List[tuple]:
+    """
+    Normalize one page of declarations; append NDJSON (skipped if out_f is None) + log rows.
+    Returns the records written, as log rows (LOG_HEADER order).
+    FEMA repeats a county once per declared program/amendment; only the first row per
+    (disasterNumber, county FIPS) is kept, tracked in `seen` across pages.
+    Single pass per record: NDJSON lines go into one byte buffer and log rows into one list,
+    each written once per page.
+    """
+    buf = bytearray()
+    log_rows = []
+    for d in rows:
+        decl_dt = norm_date(d.get("declarationDate") or "")
+        if not decl_dt:
+            continue
+
+        # Combine fipsStateCode(2) + fipsCountyCode(3) -> 5-digit county FIPS.
+        # Map keys are all digits, so the lookup also rejects non-numeric codes;
+        # some declarations lack county-level FIPS, skip those too.
+        fips5 = (d.get("fipsStateCode") or "").zfill(2) + (d.get("fipsCountyCode") or "").zfill(3)
+        place = fips_map.get(fips5)
+        if place is None:
+            continue
+        state_name, county_clean = place
+
+        dis_num = d.get("disasterNumber")
+        key = (dis_num, fips5)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        incident_type = d.get("incidentType") or ""
+        disaster = norm_disaster(incident_type) or incident_type.lower()
+
+        if out_f is not None:
+            rec = {
+                "state": state_name,
+                "county": county_clean,
+                "county_fips": fips5,
+                "date": decl_dt,
+                "disaster": disaster,
+                "fema_incident_type": incident_type,
+                "fema_disaster_number": dis_num,
+                "source": "FEMA",
+            }
+            buf += orjson.dumps(rec)
+            buf += b"\n"
+        log_rows.append((decl_dt, state_name, fips5, county_clean, incident_type, disaster, dis_num))
+    if out_f is not None:
+        out_f.write(buf)
+    log_w.writerows(log_rows)
+    return log_rows
+
+# ---------------- optional Parquet output (pyarrow only needed with --parquet) ----------------
+def open_parquet(path: Path):
+    """ParquetWriter with the NDJSON record's columns."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([
+        ("state", pa.string()),
+        ("county", pa.string()),
+        ("county_fips", pa.string()),
+        ("date", pa.string()),
+        ("disaster", pa.string()),
+        ("fema_incident_type", pa.string()),
+        ("fema_disaster_number", pa.int32()),
+        ("source", pa.string()),
+    ])
+    return pq.ParquetWriter(path, schema, compression="zstd")
+
+def write_parquet(writer, records: List[tuple]):
+    """Write log-row tuples (see write_rows) as one row group."""
+    import pyarrow as pa
+    dates, states, fips, counties, types, disasters, numbers = (list(c) for c in zip(*records))
+    writer.write_table(pa.table({
+        "state": states,
+        "county": counties,
+        "county_fips": fips,
+        "date": dates,
+        "disaster": disasters,
+        "fema_incident_type": types,
+        "fema_disaster_number": numbers,
+        "source": ["FEMA"] * len(records),
+    }, schema=writer.schema))
 
 def main():
     ap = argparse.ArgumentParser(description="Fetch FEMA Disaster Declarations into NDJSON.")
@@ -197,6 +356,10 @@ def main():
     ap.add_argument("--state", type=str, default=None, help="Limit to a 2-letter state code (e.g., AZ)")
     ap.add_argument("--fema-types", type=str, default=None, help="Comma list of FEMA incidentType values (e.g., Flood,Hurricane)")
     ap.add_argument("--max-pages", type=int, default=None, help="Stop after N pages (debug)")
+    fmt = ap.add_mutually_exclusive_group()
+    fmt.add_argument("--zstd", action="store_true", help="Write zstd-compressed NDJSON to <out>.zst (needs zstandard)")
+    fmt.add_argument("--parquet", action="store_true",
+                     help="Write <out> as .parquet instead of NDJSON; overwrites, no append (needs pyarrow)")
     args = ap.parse_args()
 
     # Convert to full ISO instants for the API filter
@@ -208,8 +371,25 @@ def main():
 
     fips_map = load_fips_mapping(COUNTIES_CSV)
 
-    out_f = args.out.open("a", encoding="utf-8")
-    log_path = args.log
+    out_path = args.out
+    pq_writer = None
+    if args.parquet:
+        out_path = args.out.with_suffix(".parquet")
+        pq_writer = open_parquet(out_path)
+        out_f = None
+    elif args.zstd:
+        import zstandard  # optional dependency, only needed for --zstd
+        # appending adds a new frame per run; read back with read_across_frames=True (or zstd -d)
+        out_path = args.out.with_name(args.out.name + ".zst")
+        out_f = zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(out_path.open("ab"))
+    else:
+        out_f = out_path.open("ab")
+    # one log handle + writer for the whole run (no per-row stat/open/close)
+    need_header = not args.log.exists() or args.log.stat().st_size == 0
+    log_f = args.log.open("a", newline="", encoding="utf-8")
+    log_w = csv.writer(log_f)
+    if need_header:
+        log_w.writerow(LOG_HEADER)
 
     # IMPORTANT: correct, case-sensitive field names
     params = {
@@ -231,68 +411,39 @@ def main():
 
     print("FEMA fetch started with filter:")
     print(" ", params["$filter"])
-    print("Writing NDJSON to:", args.out)
+    print("Writing Parquet to:" if pq_writer else "Writing NDJSON to:", out_path)
     print("Writing log CSV to:", args.log)
 
     pages = 0
     rows_written = 0
-
-    while True:
-        data = fetch_page(params)
-        rows = data.get("DisasterDeclarationsSummaries", [])
-        if not rows:
-            break
-
-        for d in rows:
-            decl_dt = norm_date(d.get("declarationDate") or "")
-            if not decl_dt:
-                continue
-
-            incident_type = d.get("incidentType") or ""
-            normalized = norm_disaster(incident_type)
-
-            # Combine fipsStateCode(2) + fipsCountyCode(3) -> 5-digit county FIPS
-            fips2 = (d.get("fipsCountyCode") or "").zfill(3)
-            state_num = (d.get("fipsStateCode") or "").zfill(2)
-            if not (fips2.isdigit() and state_num.isdigit()):
-                continue
-            fips5 = state_num + fips2
-
-            if fips5 not in fips_map:
-                # Some declarations lack county-level FIPS; skip those
-                continue
-
-            state_name, county_clean = fips_map[fips5]
-            dis_num = d.get("disasterNumber")
-
-            rec = {
-                "state": state_name,
-                "county": county_clean,
-                "county_fips": fips5,
-                "date": decl_dt,
-                "disaster": normalized or incident_type.lower(),
-                "fema_incident_type": incident_type,
-                "fema_disaster_number": dis_num,
-                "source": "FEMA",
-            }
-            out_f.write(json.dumps(rec, ensure_ascii=False) + "\n")
-            rows_written += 1
-
-            write_log_row(
-                log_path,
-                [decl_dt, state_name, fips5, county_clean, incident_type, rec["disaster"], dis_num],
-            )
-
-        pages += 1
-        params["$skip"] += PAGE_SIZE
-        time.sleep(SLEEP_BETWEEN)
-
-        if args.max_pages and pages >= args.max_pages:
-            print("Stopping early due to --max-pages =", args.max_pages)
-            break
-
-    out_f.close()
-    print(f"Done. Wrote {rows_written} records across {pages} page(s) to {args.out}")
+    seen: Set[Tuple[object, str]] = set()
+    pq_buf: List[tuple] = []
+
+    try:
+        with ThreadPoolExecutor(max_workers=WINDOW) as ex:
+            for rows in iter_pages(ex, params, args.max_pages):
+                written = write_rows(rows, fips_map, out_f, log_w, seen)
+                rows_written += len(written)
+                log_f.flush()
+                pages += 1
+                if pq_writer:
+                    pq_buf += written
+                    if len(pq_buf) >= PARQUET_BATCH_ROWS:
+                        write_parquet(pq_writer, pq_buf)
+                        pq_buf.clear()
+    finally:
+        if pq_writer:
+            if pq_buf:
+                write_parquet(pq_writer, pq_buf)
+            pq_writer.close()
+        else:
+            out_f.close()
+        log_f.close()
+
+    if args.max_pages and pages >= args.max_pages:
+        print("Stopped early due to --max-pages =", args.max_pages)
+
+    print(f"Done. Wrote {rows_written} records across {pages} page(s) to {out_path}")
     print("Log at:", args.log)
 
 if __name__ == "__main__":
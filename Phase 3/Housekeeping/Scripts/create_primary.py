@@ -18,16 +18,52 @@ Run:
 import argparse
 import csv
 import hashlib
+import itertools
 import json
 import sys
 import time
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
+
+import orjson
+import pandas as pd
 
 
 BATCH_SIZE = 1000
+CSV_CHUNK_ROWS = 200_000   # rows per pandas chunk in process_csv (bounds memory)
+HASH_SLICE_ROWS = 25_000   # URLs per task when hashing with --workers > 1
 LOG_FILE = "pk_generation.log"
+PK_FIELD = "unique_entity_identifier"
+LOG_FLUSH_LINES = 64       # buffered log lines per append to LOG_FILE
+
+# log timestamps: one wall-clock anchor, advanced by the monotonic clock
+_T0 = time.monotonic()
+_WALL0 = datetime.utcnow()
+_LOG_BUF: List[str] = []
+
+
+def url_hash(u: str) -> str:
+    # not a security use: lets OpenSSL take its fast path (and work on FIPS-mode builds);
+    # still SHA-1, so existing ids are unchanged
+    return hashlib.sha1(u.encode("utf-8"), usedforsecurity=False).hexdigest()[:10]
+
+
+def hash_urls(urls: List[str]) -> List[str]:
+    """url_hash over a list (the unit of work sent to the process pool)."""
+    return [url_hash(u) for u in urls]
+
+
+def hash_column(urls: pd.Series, pool: Optional[ProcessPoolExecutor]) -> pd.Series:
+    """url_hash for every value of a column; spread over the pool's processes when given one."""
+    if pool is None:
+        return urls.map(url_hash)
+    values = urls.tolist()
+    slices = [values[i:i + HASH_SLICE_ROWS] for i in range(0, len(values), HASH_SLICE_ROWS)]
+    hashes = itertools.chain.from_iterable(pool.map(hash_urls, slices))
+    return pd.Series(list(hashes), index=urls.index, dtype=object)
 
 
 def make_row_id(disaster_number: Optional[str],
@@ -49,29 +85,26 @@ def make_row_id(disaster_number: Optional[str],
         warn = f"Missing key fields for row {fallback_suffix}: disasterNumber={dn}, county_fips={cf}, url={u!r}"
         return row_id, warn
 
-    h = hashlib.sha1(u.encode("utf-8")).hexdigest()[:10]
-    row_id = f"{dn}_{cf}_{h}"
+    row_id = f"{dn}_{cf}_{url_hash(u)}"
     return row_id, None
 
 
-def count_lines(path: Path) -> int:
-    """Count non-empty lines in a text file."""
-    total = 0
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                total += 1
-    return total
+def log_batch(message: str):
+    ts = (_WALL0 + timedelta(seconds=time.monotonic() - _T0)).isoformat(timespec="seconds") + "Z"
+    _LOG_BUF.append(f"[{ts}] {message}\n")
+    if len(_LOG_BUF) >= LOG_FLUSH_LINES:
+        flush_log()
 
 
-def log_batch(message: str):
-    ts = datetime.utcnow().isoformat(timespec="seconds") + "Z"
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(f"[{ts}] {message}\n")
+def flush_log():
+    if _LOG_BUF:
+        with open(LOG_FILE, "a", encoding="utf-8") as f:
+            f.writelines(_LOG_BUF)
+        _LOG_BUF.clear()
 
 
 def print_progress(prefix: str, done: int, total: int):
-    """ASCII progress bar."""
+    """ASCII progress bar (done/total are bytes read, so no counting pre-pass is needed)."""
     bar_len = 40
     if total <= 0:
         total = 1
@@ -84,48 +117,64 @@ def print_progress(prefix: str, done: int, total: int):
         sys.stdout.write("\n")
 
 
-def process_csv(csv_path: Path, out_path: Path):
+def key_column(chunk: pd.DataFrame, name: str) -> pd.Series:
+    """Stripped string column; all-empty if the input has no such column."""
+    if name not in chunk.columns:
+        return pd.Series("", index=chunk.index, dtype=str)
+    return chunk[name].fillna("").str.strip()
+
+
+def process_csv(csv_path: Path, out_path: Path, pool: Optional[ProcessPoolExecutor] = None):
     if not csv_path.exists():
         print(f"[csv] input not found: {csv_path}")
         return
 
-    print(f"[csv] Counting rows in {csv_path} ...")
-    total_rows = count_lines(csv_path) - 1  # minus header
-    if total_rows < 0:
-        total_rows = 0
+    total_bytes = csv_path.stat().st_size
+    print(f"[csv] Reading {csv_path} ({total_bytes} bytes) ...")
+    log_batch(f"CSV start: {csv_path} with {total_bytes} bytes")
 
-    print(f"[csv] Found ~{total_rows} data rows.")
-    log_batch(f"CSV start: {csv_path} with ~{total_rows} rows")
+    try:
+        columns = list(pd.read_csv(csv_path, dtype=str, nrows=0).columns)
+    except pd.errors.EmptyDataError:
+        columns = []
 
-    with csv_path.open("r", newline="", encoding="utf-8") as fin, \
+    with csv_path.open("rb") as fin, \
          out_path.open("w", newline="", encoding="utf-8") as fout:
-
-        reader = csv.DictReader(fin)
-        fieldnames = ["unique_entity_identifier"] + (reader.fieldnames or [])
-        writer = csv.DictWriter(fout, fieldnames=fieldnames)
-        writer.writeheader()
+        # header via csv.writer so an input without data rows still gets one
+        csv.writer(fout).writerow(["unique_entity_identifier"] + columns)
 
         processed = 0
         batch_index = 0
 
-        for idx, row in enumerate(reader):
-            dn = row.get("disasterNumber")
-            cf = row.get("county_fips")
-            url = row.get("url")
-
-            row_id, warn = make_row_id(dn, cf, url, f"csv_{idx}")
-            if warn:
+        if columns:
+            chunks = pd.read_csv(fin, dtype=str, keep_default_na=False, chunksize=CSV_CHUNK_ROWS)
+        else:
+            chunks = []
+
+        for chunk in chunks:
+            dn = key_column(chunk, "disasterNumber")
+            cf = key_column(chunk, "county_fips")
+            urls = key_column(chunk, "url")
+            row_ids = dn + "_" + cf + "_" + hash_column(urls, pool)
+
+            # the chunk index continues across chunks, i.e. it is the data-row number
+            missing = (dn == "") | (cf == "") | (urls == "")
+            for idx in chunk.index[missing]:
+                row_id, warn = make_row_id(dn[idx], cf[idx], urls[idx], f"csv_{idx}")
+                row_ids[idx] = row_id
                 log_batch("[csv warning] " + warn)
 
-            row_out = dict(row)
-            row_out["unique_entity_identifier"] = row_id
-            writer.writerow(row_out)
+            chunk.insert(0, "unique_entity_identifier", row_ids)
+            chunk.to_csv(fout, header=False, index=False, lineterminator="\r\n")
 
-            processed += 1
-            if processed % BATCH_SIZE == 0:
+            prev = processed
+            processed += len(chunk)
+            for n in range((prev // BATCH_SIZE + 1) * BATCH_SIZE, processed + 1, BATCH_SIZE):
                 batch_index += 1
-                log_batch(f"[csv] batch {batch_index} processed {processed} rows")
-            print_progress("[csv] Adding primary key", processed, total_rows)
+                log_batch(f"[csv] batch {batch_index} processed {n} rows")
+            print_progress("[csv] Adding primary key", min(fin.tell(), total_bytes - 1), total_bytes)
+
+        print_progress("[csv] Adding primary key", total_bytes, total_bytes)
 
     log_batch(f"[csv] done: wrote {processed} rows to {out_path}")
     print(f"[csv] Done. Wrote {processed} rows to {out_path}")
@@ -136,26 +185,33 @@ def process_ndjson(ndjson_path: Path, out_path: Path):
         print(f"[ndjson] input not found: {ndjson_path}")
         return
 
-    print(f"[ndjson] Counting rows in {ndjson_path} ...")
-    total_rows = count_lines(ndjson_path)
-    print(f"[ndjson] Found ~{total_rows} records.")
-    log_batch(f"NDJSON start: {ndjson_path} with ~{total_rows} rows")
+    total_bytes = ndjson_path.stat().st_size
+    print(f"[ndjson] Reading {ndjson_path} ({total_bytes} bytes) ...")
+    log_batch(f"NDJSON start: {ndjson_path} with {total_bytes} bytes")
 
-    with ndjson_path.open("r", encoding="utf-8") as fin, \
-         out_path.open("w", encoding="utf-8") as fout:
+    # binary in and out: progress is the byte count consumed, and each record is written
+    # back as its original bytes with the PK spliced in before the closing brace
+    with ndjson_path.open("rb") as fin, \
+         out_path.open("wb") as fout:
 
         processed = 0
         batch_index = 0
+        bytes_read = 0
 
         for idx, line in enumerate(fin):
+            bytes_read += len(line)
             line = line.strip()
             if not line:
                 continue
             try:
-                obj = json.loads(line)
-            except Exception as e:
-                log_batch(f"[ndjson error] line {idx}: {e}")
-                continue
+                obj = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # orjson rejects a few things json accepts (NaN, huge ints)
+                try:
+                    obj = json.loads(line)
+                except Exception as e:
+                    log_batch(f"[ndjson error] line {idx}: {e}")
+                    continue
 
             dn = obj.get("disasterNumber")
             cf = obj.get("county_fips")
@@ -165,14 +221,21 @@ def process_ndjson(ndjson_path: Path, out_path: Path):
             if warn:
                 log_batch("[ndjson warning] " + warn)
 
-            obj["unique_entity_identifier"] = row_id
-            fout.write(json.dumps(obj, ensure_ascii=False) + "\n")
+            if isinstance(obj, dict) and obj and PK_FIELD not in obj and line.endswith(b"}"):
+                # append-only edit: same bytes json.dumps(obj) would give for input it wrote itself
+                fout.write(line[:-1] + b', "' + PK_FIELD.encode() + b'": '
+                           + json.dumps(row_id, ensure_ascii=False).encode("utf-8") + b"}\n")
+            else:
+                obj[PK_FIELD] = row_id
+                fout.write(json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n")
 
             processed += 1
             if processed % BATCH_SIZE == 0:
                 batch_index += 1
                 log_batch(f"[ndjson] batch {batch_index} processed {processed} rows")
-            print_progress("[ndjson] Adding primary key", processed, total_rows)
+                print_progress("[ndjson] Adding primary key", min(bytes_read, total_bytes - 1), total_bytes)
+
+        print_progress("[ndjson] Adding primary key", total_bytes, total_bytes)
 
     log_batch(f"[ndjson] done: wrote {processed} rows to {out_path}")
     print(f"[ndjson] Done. Wrote {processed} rows to {out_path}")
@@ -190,6 +253,8 @@ def main():
                     help="Output CSV file (default: articles_with_id.csv)")
     ap.add_argument("--ndjson-out", type=str, default="articles_with_id.ndjson",
                     help="Output NDJSON file (default: articles_with_id.ndjson)")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Processes for hashing CSV URLs (default: 1, hash in-process)")
     args = ap.parse_args()
 
     csv_path = Path(args.csv)
@@ -200,11 +265,15 @@ def main():
     start_ts = datetime.utcnow().isoformat(timespec="seconds") + "Z"
     log_batch(f"=== PK generation run started at {start_ts} ===")
 
-    process_csv(csv_path, csv_out)
-    process_ndjson(ndjson_path, ndjson_out)
+    try:
+        with (ProcessPoolExecutor(args.workers) if args.workers > 1 else nullcontext()) as pool:
+            process_csv(csv_path, csv_out, pool)
+        process_ndjson(ndjson_path, ndjson_out)
 
-    end_ts = datetime.utcnow().isoformat(timespec="seconds") + "Z"
-    log_batch(f"=== PK generation run finished at {end_ts} ===")
+        end_ts = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+        log_batch(f"=== PK generation run finished at {end_ts} ===")
+    finally:
+        flush_log()
 
 
 if __name__ == "__main__":